@@ -0,0 +1,358 @@
+"""
+analysis_service.py
+
+Long running analysis service. Keeps the stock data, the analysis results
+and the stored strategy parameters in memory, re-analyzes on a schedule or
+when new stock data is written and answers queries over a local HTTP
+endpoint (TCP or unix socket).
+
+Endpoints:
+    GET  /status          service state
+    GET  /stocks          the latest result of all monitored stocks
+    GET  /stocks/<name>   the latest result of one stock, by name or symbol
+    POST /refresh         re-analyze all stocks now
+    POST /refresh/<name>  re-analyze one stock now
+
+Author: Björn Johansson
+Date: 2026-10-19
+"""
+import asyncio
+import json
+import os
+import signal
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import unquote, urlsplit
+from analyze_data import StockAnalyzer
+from simple_moving_average_strategy import simple_moving_average_strategy as sma
+
+HTTP_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request",
+                404: "Not Found", 405: "Method Not Allowed"}
+
+
+class AnalysisService:
+
+    def __init__(self, analyzer=None):
+        """Constructor
+
+        Args:
+            analyzer (StockAnalyzer): the analyzer to use, a new one if None
+        """
+        self.analyzer = analyzer if analyzer is not None else StockAnalyzer()
+        self.configuration = self.analyzer.configuration
+        self.stocks = {stock["name"]: stock for stock in self.configuration.get_monitored_stocks()}
+        self.history = {}
+        self.data_mtimes = {}
+        # the data each result was computed from, a result is only
+        # recomputed when the data has changed or on explicit refresh
+        self.data_keys = {}
+        self.result_keys = {}
+        self.stored_params = {}
+        self.results = {}
+        self.stale = set()
+        self.analyzing = None
+        self.last_analysis = None
+        # one worker, the analysis runs outside the event loop so queries
+        # are answered from the current results while recomputing. The csv
+        # files are read in the default executor so new data is not queued
+        # behind the analysis
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.analysis_lock = None
+        self.tasks = set()
+
+
+    def restore_stored_params(self):
+        """Read the stored strategy parameters of all monitored stocks
+        """
+        for name, stock in self.stocks.items():
+            a = sma()
+            if a.restore_params(self.analyzer.get_params_path(stock)):
+                self.stored_params[name] = {"sma_params": [a.best_sma, a.best_lma]}
+
+
+    @staticmethod
+    def data_key(history_values):
+        """Identify the data a result is computed from
+
+        Args:
+            history_values (panda): the history values
+        Return:
+            tuple of the number of days, the last date and the last close
+        """
+        last_frame = history_values.iloc[-1]
+        return len(history_values), str(last_frame["Date"]), float(last_frame["Close"])
+
+
+    async def load_changed_data(self):
+        """Read the stock data of all stocks whose csv file has changed since last read.
+        Only called by watch_data, so each file is read once
+
+        Return:
+            list of the names of the stocks with new data
+        """
+        loop = asyncio.get_running_loop()
+        changed = []
+        for name, stock in self.stocks.items():
+            try:
+                mtime = os.stat(self.analyzer.get_csv_path(stock)).st_mtime
+            except OSError:
+                continue
+            if self.data_mtimes.get(name) == mtime:
+                continue
+            try:
+                history_values = await loop.run_in_executor(
+                    None, self.analyzer.load_history, stock)
+                data_key = self.data_key(history_values)
+            except Exception as e:
+                print(f"ERROR: could not read data for {name}: {e}")
+                continue
+            self.history[name] = history_values
+            self.data_keys[name] = data_key
+            self.data_mtimes[name] = mtime
+            # a rewritten csv without a new bar keeps its cached result
+            if self.result_keys.get(name) != data_key:
+                self.stale.add(name)
+                changed.append(name)
+        return changed
+
+
+    def analyze_one(self, name):
+        """Analyze one stock, run in the executor
+
+        Args:
+            name (string): the name of the stock to analyze
+        """
+        # analyze a copy, the strategies add columns to the values
+        history_values = self.history[name].copy()
+        data_key = self.data_keys[name]
+        return self.analyzer.analyze_stock(self.stocks[name], history_values), data_key
+
+
+    def queue_analysis(self, names, only_changed=False):
+        """Mark stocks as pending so the next analyze call analyzes them
+
+        Args:
+            names (list): the names of the stocks to queue
+            only_changed (bool): skip stocks whose cached result is computed from the current data
+        Return:
+            list of the queued names, stocks without data are skipped
+        """
+        names = [name for name in names if name in self.history]
+        if only_changed:
+            names = [name for name in names if self.result_keys.get(name) != self.data_keys[name]]
+        self.stale.update(names)
+        return names
+
+
+    async def analyze(self, names):
+        """Analyze the pending stocks among the given stocks. The lock is
+        taken per stock, so stocks with new data are not queued behind a
+        whole run. Results are replaced one stock at a time.
+
+        Args:
+            names (list): the names of the stocks to analyze
+        """
+        loop = asyncio.get_running_loop()
+        for name in names:
+            async with self.analysis_lock:
+                if name not in self.stale:
+                    continue
+                self.analyzing = name
+                self.stale.discard(name)
+                try:
+                    result, data_key = await loop.run_in_executor(self.executor, self.analyze_one, name)
+                except Exception as e:
+                    print(f"ERROR: analysis of {name} failed: {e}")
+                    continue
+                finally:
+                    self.analyzing = None
+                result["analyzed_at"] = datetime.now().isoformat(timespec="seconds")
+                self.results[name] = result
+                self.result_keys[name] = data_key
+                self.stored_params[name] = {"sma_params": result["sma_params"]}
+                self.last_analysis = result["analyzed_at"]
+
+
+    async def watch_data(self):
+        """Analyze stocks as soon as new data has been written
+        """
+        while True:
+            try:
+                changed = await self.load_changed_data()
+                if changed:
+                    self.start_task(self.analyze(changed))
+            except Exception as e:
+                print(f"ERROR: checking for new data failed: {e!r}")
+            await asyncio.sleep(self.configuration.get_service_poll_interval())
+
+
+    async def schedule_analysis(self):
+        """Re-analyze, on the configured interval, the stocks whose result is
+        missing or not computed from the current data, e.g. after a failed analysis
+        """
+        while True:
+            await asyncio.sleep(self.configuration.get_service_analyze_interval())
+            await self.analyze(self.queue_analysis(list(self.stocks), only_changed=True))
+
+
+    def start_task(self, coroutine):
+        """Run a coroutine in the background, keeping a reference to it
+
+        Args:
+            coroutine (coroutine): the coroutine to run
+        """
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.task_done)
+
+
+    def task_done(self, task):
+        """Forget a finished background task, log it if it failed
+
+        Args:
+            task (asyncio.Task): the finished task
+        """
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"ERROR: background task {task.get_coro().__qualname__} failed: {task.exception()!r}")
+
+
+    def get_stock_result(self, name):
+        """Get the current result of a stock
+
+        Args:
+            name (string): the name of the stock
+        """
+        stock = self.stocks[name]
+        if name in self.results:
+            result = dict(self.results[name])
+        else:
+            result = {"name": stock["name"], "symbol": stock["symbol"]}
+        result["stored_params"] = self.stored_params.get(name)
+        result["has_data"] = name in self.history
+        result["pending"] = name in self.stale or name == self.analyzing
+        return result
+
+
+    def route(self, method, target):
+        """Handle one request
+
+        Args:
+            method (string): the HTTP method
+            target (string): the request target, e.g. /stocks/Apple
+        Return:
+            the HTTP status and the body to send as json
+        """
+        parts = [unquote(p) for p in urlsplit(target).path.split("/") if p]
+        if not parts:
+            parts = ["status"]
+        if parts[0] in ("status", "stocks") and method != "GET":
+            return 405, {"error": f"{method} not allowed"}
+        if parts[0] == "refresh" and method != "POST":
+            return 405, {"error": f"{method} not allowed"}
+
+        if parts == ["status"]:
+            return 200, {"version": self.configuration.get_current_software_version(),
+                         "stocks": len(self.stocks),
+                         "loaded": len(self.history),
+                         "analyzed": len(self.results),
+                         "analyzing": self.analyzing,
+                         "pending": sorted(self.stale),
+                         "last_analysis": self.last_analysis}
+        if parts == ["stocks"]:
+            return 200, [self.get_stock_result(name) for name in self.stocks]
+        if parts[0] in ("stocks", "refresh") and len(parts) == 2:
+            stock = self.configuration.find_monitored_stock(parts[1])
+            if stock is None:
+                return 404, {"error": f"{parts[1]} is not a monitored stock"}
+            if parts[0] == "stocks":
+                return 200, self.get_stock_result(stock["name"])
+            names = self.queue_analysis([stock["name"]])
+            self.start_task(self.analyze(names))
+            return 202, {"refreshing": names}
+        if parts == ["refresh"]:
+            names = self.queue_analysis(list(self.stocks))
+            self.start_task(self.analyze(names))
+            return 202, {"refreshing": names}
+        return 404, {"error": f"unknown path {target}"}
+
+
+    async def handle_connection(self, reader, writer):
+        """Read one HTTP request from the connection and answer it
+
+        Args:
+            reader (asyncio.StreamReader): the connection reader
+            writer (asyncio.StreamWriter): the connection writer
+        """
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+            if len(request_line) < 2:
+                status, body = 400, {"error": "malformed request"}
+            else:
+                status, body = self.route(request_line[0].upper(), request_line[1])
+            payload = json.dumps(body).encode()
+            writer.write((f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                          "Content-Type: application/json\r\n"
+                          f"Content-Length: {len(payload)}\r\n"
+                          "Connection: close\r\n\r\n").encode() + payload)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+    async def serve(self):
+        """Start the service and run until cancelled or until SIGTERM/SIGINT
+        """
+        self.analysis_lock = asyncio.Lock()
+        self.restore_stored_params()
+        host, port, socket_path = self.configuration.get_service_address()
+        if socket_path is not None:
+            if os.path.exists(socket_path):
+                if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                    raise FileExistsError(f"{socket_path} exists and is not a socket")
+                os.remove(socket_path)
+            server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+            print(f"Analysis service listening on {socket_path}")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            print(f"Analysis service listening on http://{host}:{port}")
+        self.start_task(self.watch_data())
+        self.start_task(self.schedule_analysis())
+        loop = asyncio.get_running_loop()
+        serve_task = asyncio.ensure_future(server.serve_forever())
+        stop_signals = []
+        for stop_signal in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(stop_signal, serve_task.cancel)
+                stop_signals.append(stop_signal)
+            except (NotImplementedError, RuntimeError):
+                pass  # not supported on this platform or thread
+        try:
+            async with server:
+                try:
+                    await serve_task
+                except asyncio.CancelledError:
+                    pass
+        finally:
+            for stop_signal in stop_signals:
+                loop.remove_signal_handler(stop_signal)
+            for task in list(self.tasks):
+                task.cancel()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            if socket_path is not None and os.path.exists(socket_path) \
+                    and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                os.remove(socket_path)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(AnalysisService().serve())
+    except KeyboardInterrupt:
+        pass
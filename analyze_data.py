@@ -10,7 +10,7 @@ Date: 2023-04-11
 from datetime import datetime
 import os
 from configuration import Configuration
-import yfinance as yf
+import utilities
 import pandas as pd
 from simple_moving_average_strategy import simple_moving_average_strategy as sma
 from exponential_moving_average_strategy import exponential_moving_average_strategy as ema
@@ -25,8 +25,7 @@ class StockAnalyzer:
         self.output_folder = None
         self.configuration = Configuration()
         self.data_path = "./stock_data"
-        if not os.path.exists(self.data_path):
-            os.makedirs(self.data_path)
+        self.params_path = "./saved_stock_parameters"
 
 
     def get_csv_path(self, stock):
@@ -38,14 +37,21 @@ class StockAnalyzer:
         return f"{self.data_path}/{stock['name']}.csv"
 
 
-    def download_all_data(self):
+    def download_all_data(self, stocks=None):
         """Download the stock data for all monitored stocks
 
         Args:
-            data_path (string): absolute or relative path to where to save the data
+            stocks (list): the stocks to download, all monitored stocks if None
         """
+        # yfinance is slow to import, only load it when downloading
+        import yfinance as yf
+
+        if not os.path.exists(self.data_path):
+            os.makedirs(self.data_path)
         proxy = self.configuration.get_proxy()
-        for stock in self.configuration.get_monitored_stocks():
+        if stocks is None:
+            stocks = self.configuration.get_monitored_stocks()
+        for stock in stocks:
             stock_data = yf.download(stock["symbol"] ,period="max", proxy=proxy)
             temp_data = stock_data.copy(deep=True)
             temp_data.to_csv(self.get_csv_path(stock))
@@ -59,37 +65,115 @@ class StockAnalyzer:
             os.makedirs(self.output_folder)
 
 
+    def get_params_path(self, stock):
+        """Get the path to the stored strategy parameters for the given stock
+
+        Args:
+            stock (dictionary): the stock to get the parameter path for
+        """
+        return f"{self.params_path}/{stock['name']}.json"
+
+
+    def load_history(self, stock):
+        """Read the stored history values for the given stock, limited to
+        the configured number of days to analyze
+
+        Args:
+            stock (dictionary): the stock to read the history values for
+        Return:
+            the history values as a panda data frame
+        """
+        history_values = pd.read_csv(self.get_csv_path(stock))
+        history_values = history_values[-self.configuration.get_num_days_to_analyze():]
+        history_values.reset_index(inplace=True)
+        history_values.set_index('Date')
+        return history_values
+
+
+    def analyze_stock(self, stock, history_values):
+        """Evaluate all strategies for one stock and store the best parameters
+
+        Args:
+            stock (dictionary): the stock to analyze
+            history_values (panda stock data): the values to analyze
+        Return:
+            a dict with the return and parameters of each strategy, the best
+            strategy and the latest signal
+        """
+        initial_cash = self.configuration.get_initial_cash_for_simulation()
+        c = bhs()
+        bh_return = c.evaluate_strategy(history_values, initial_cash)
+        a = sma()
+        sma_return, sma_params = a.find_best_parameters(history_values, initial_cash)
+        if not os.path.exists(self.params_path):
+            os.makedirs(self.params_path)
+        a.store_current_params(self.get_params_path(stock))
+        sma_signal_date, sma_signal = utilities.get_latest_signal(history_values)
+        #b = ema()
+        #ema_return, ema_params = b.find_best_parameters(history_values, initial_cash)
+        ema_return = 0
+        ema_params = None
+
+        max_active = max(sma_return, ema_return)
+        if bh_return > max_active:
+            best_strategy = "buy_and_hold"
+            signal_date, signal = None, 0
+        elif sma_return > ema_return:
+            best_strategy = "sma"
+            signal_date, signal = sma_signal_date, sma_signal
+        else:
+            best_strategy = "ema"
+            signal_date, signal = None, 0
+
+        last_frame = history_values.iloc[-1]
+        return {
+            "name": stock["name"],
+            "symbol": stock["symbol"],
+            "last_date": str(last_frame["Date"]),
+            "last_close": float(last_frame["Close"]),
+            "buy_and_hold_return": float(bh_return),
+            "sma_return": float(sma_return),
+            "sma_params": list(sma_params),
+            "ema_return": float(ema_return),
+            "ema_params": list(ema_params) if ema_params is not None else None,
+            "best_strategy": best_strategy,
+            "signal": signal,
+            "signal_date": signal_date,
+            "sma_signal": sma_signal,
+            "sma_signal_date": sma_signal_date,
+        }
+
+
+    def plot_result(self, stock, history_values, result):
+        """Plot the best strategy of an analysis result
+
+        Args:
+            stock (dictionary): the analyzed stock
+            history_values (panda stock data): the analyzed values
+            result (dict): the result as returned by analyze_stock
+        """
+        plot_values = history_values.tail(self.configuration.get_num_days_to_plot()).copy()
+        if result["best_strategy"] == "buy_and_hold":
+            bhs().plot(history_values, stock['name'])
+        elif result["best_strategy"] == "sma":
+            a = sma()
+            a.set_params(plot_values, result["sma_params"])
+            a.plot(plot_values, stock['name'])
+        else:
+            b = ema()
+            b.set_params(plot_values, result["ema_params"])
+            b.plot(plot_values, stock['name'])
+
+
     def analyze_all(self):
         """Analyze all monitored stocks.
         """
         self.create_output_folder()
         for stock in self.configuration.get_monitored_stocks():
             print(f"Analyzing {stock['name']}")
-            history_values = pd.read_csv(self.get_csv_path(stock))
-            history_values = history_values[-self.configuration.get_num_days_to_analyze():]
-            history_values.reset_index(inplace=True)
-            history_values.set_index('Date')
-            c = bhs()
-            bh_return = c.evaluate_strategy(history_values, self.configuration.get_initial_cash_for_simulation())
-            a = sma()
-            sma_return, sma_params = a.find_best_parameters(history_values, self.configuration.get_initial_cash_for_simulation())
-            a.store_current_params(f"./saved_stock_parameters/{stock['name']}.json")
-            b = ema()
-            #ema_return, ema_params = b.find_best_parameters(history_values, self.configuration.get_initial_cash_for_simulation())
-            ema_return = 0
-            ema_params = None
-
-            plot_values = history_values.tail(self.configuration.get_num_days_to_plot()).copy()
-            max_active = max(sma_return, ema_return)
-            if bh_return > max_active:
-                c.plot(history_values, stock['name'])
-            else:
-                if sma_return > ema_return:
-                    a.set_params(plot_values, sma_params)
-                    a.plot(plot_values, stock['name'])
-                else:
-                    b.set_params(plot_values, ema_params)
-                    b.plot(plot_values, stock['name'])
+            history_values = self.load_history(stock)
+            result = self.analyze_stock(stock, history_values)
+            self.plot_result(stock, history_values, result)
             break
 
 
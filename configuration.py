@@ -7,22 +7,44 @@ Author: Björn Johansson
 Date: 2023-04-10
 """
 import json
+import os
 
 class Configuration:
 
-    """The configuration json object, read from "stock_config.json"
+    """The configuration json object, read from config_path
     """
     config_json = None
 
+    """Path to the config file. The default config file is looked up next to
+    this file if it does not exist in the current directory
+    """
+    default_config_path = "stock_config.json"
+    config_path = default_config_path
+
 
     def __init__(self):
         """Construct this class, read the config file if needed
         """
         if Configuration.config_json is None:
-            with open("stock_config.json") as config_file:
+            config_path = Configuration.config_path
+            if config_path == Configuration.default_config_path and not os.path.exists(config_path):
+                config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), config_path)
+            with open(config_path) as config_file:
                 Configuration.config_json = json.load(config_file)
 
 
+    @staticmethod
+    def use_config_file(config_path):
+        """Use another config file, it is read on next construction.
+        The path is used exactly as given
+
+        Args:
+            config_path (string): path to the config file
+        """
+        Configuration.config_path = config_path
+        Configuration.config_json = None
+
+
     def get_monitored_stocks(self):
         '''
         Get all stocks we are currently interested in
@@ -31,6 +53,20 @@ class Configuration:
         return Configuration.config_json["monitored_stocks"]
 
 
+    def find_monitored_stock(self, name):
+        """Find a monitored stock by name or symbol, case insensitive
+
+        Args:
+            name (string): the name or symbol of the stock
+        Returns:
+            the stock dict, None if the stock is not monitored
+        """
+        for stock in self.get_monitored_stocks():
+            if name.lower() in (stock["name"].lower(), stock["symbol"].lower()):
+                return stock
+        return None
+
+
     def get_proxy(self):
         """If a http proxy is needed, this function returns the proxy string, else None
 
@@ -64,6 +100,33 @@ class Configuration:
         return Configuration.config_json["initial_cash_for_simulation"]
 
 
+    def get_service_address(self):
+        """Get the address the analysis service listens on
+
+        Returns:
+            tuple: host, port and unix socket path. If the socket path is
+            not None, the service listens on the socket instead of host/port.
+            Defaults to 127.0.0.1, 8765 and None
+        """
+        return (Configuration.config_json.get("service_host", "127.0.0.1"),
+                Configuration.config_json.get("service_port", 8765),
+                Configuration.config_json.get("service_socket"))
+
+
+    def get_service_analyze_interval(self):
+        """Get the number of seconds between scheduled re-analysis in the analysis service,
+        defaults to 3600
+        """
+        return Configuration.config_json.get("service_analyze_interval", 3600)
+
+
+    def get_service_poll_interval(self):
+        """Get the number of seconds between checks for new stock data in the analysis service,
+        defaults to 10
+        """
+        return Configuration.config_json.get("service_poll_interval", 10)
+
+
     def get_transaction_cost(self, transaction_amount):
         """Given a transaction amount, calculate the transaction cost
 
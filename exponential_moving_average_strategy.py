@@ -10,10 +10,6 @@ Date: 2023-04-24
 
 import configuration
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import matplotlib.ticker as ticker
-import pandas as pd
 import utilities
 from collections import namedtuple
 import bisect
@@ -33,6 +29,8 @@ class exponential_moving_average_strategy:
         Args:
             params_to_set (_type_): the parameters to set
         """
+        self.best_short_ema = params_to_set[0]
+        self.best_long_ema = params_to_set[1]
         self.set_signal_points( params_to_set[0], params_to_set[1], sv)
 
 
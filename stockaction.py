@@ -0,0 +1,255 @@
+"""
+stockaction.py
+
+Command line entry point.
+
+    python stockaction.py download [-s SYMBOL ...]
+    python stockaction.py analyze  [-s SYMBOL ...]
+    python stockaction.py signals  [-s SYMBOL ...] [--service]
+    python stockaction.py report   [-s SYMBOL ...]
+    python stockaction.py serve
+
+pandas, matplotlib and yfinance are slow to import, so they are only
+imported by the subcommands that need them. "signals" never loads
+matplotlib or yfinance, and with --service it only asks the running
+analysis service.
+
+Author: Björn Johansson
+Date: 2026-10-19
+"""
+import time
+START_TIME = time.perf_counter()
+
+import argparse
+import json
+import os
+import socket
+import sys
+from configuration import Configuration
+
+SIGNAL_NAMES = {1: "BUY", -1: "SELL", 0: "-"}
+
+
+def select_stocks(configuration, names):
+    """Get the monitored stocks to run a subcommand on
+
+    Args:
+        configuration (Configuration): the configuration
+        names (list): names or symbols of the stocks, all stocks if empty
+    Return:
+        list of stock dicts
+    """
+    if not names:
+        return configuration.get_monitored_stocks()
+    stocks = []
+    for name in names:
+        stock = configuration.find_monitored_stock(name)
+        if stock is None:
+            raise SystemExit(f"error: {name} is not a monitored stock")
+        stocks.append(stock)
+    return stocks
+
+
+def print_result(result):
+    """Print the summary of an analysis result
+
+    Args:
+        result (dict): the result as returned by StockAnalyzer.analyze_stock
+    """
+    print(f"{result['name']:<20} {result['symbol']:<12} best {result['best_strategy']:<13}"
+          f"buy and hold {result['buy_and_hold_return']:>12.0f}  "
+          f"SMA {result['sma_return']:>12.0f} {result['sma_params']}")
+
+
+def print_signal(stock, signal_date, signal):
+    """Print the latest signal of a stock
+
+    Args:
+        stock (dict): the stock
+        signal_date (string): the date of the signal, None if no signal
+        signal (int): 1 for buy, -1 for sell, 0 for no signal
+    """
+    print(f"{stock['name']:<20} {stock['symbol']:<12} {SIGNAL_NAMES[signal]:<5} {signal_date or ''}")
+
+
+def print_status(stock, status):
+    """Print why there is no result for a stock
+
+    Args:
+        stock (dict): the stock
+        status (string): the reason, e.g. "no data, run download first"
+    """
+    print(f"{stock['name']:<20} {stock['symbol']:<12} {status}")
+
+
+def query_service(configuration, path):
+    """Send a GET request to the running analysis service
+
+    Args:
+        configuration (Configuration): the configuration
+        path (string): the request path, e.g. /stocks
+    Return:
+        the decoded json answer
+    """
+    host, port, socket_path = configuration.get_service_address()
+    address = socket_path if socket_path is not None else f"http://{host}:{port}"
+    try:
+        if socket_path is not None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.connect(socket_path)
+        else:
+            connection = socket.create_connection((host, port))
+        with connection:
+            connection.sendall(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            response = b""
+            while True:
+                data = connection.recv(65536)
+                if not data:
+                    break
+                response += data
+    except OSError as e:
+        raise SystemExit(f"error: analysis service is not running at {address} ({e.strerror or e})")
+    head, _, body = response.partition(b"\r\n\r\n")
+    status_line = head.split(b"\r\n", 1)[0].split()
+    if len(status_line) < 2 or not status_line[0].startswith(b"HTTP/") or not status_line[1].isdigit():
+        raise SystemExit(f"error: no valid answer from the analysis service at {address}")
+    status = int(status_line[1])
+    if status != 200:
+        raise SystemExit(f"error: service answered {status}: {body.decode()}")
+    return json.loads(body)
+
+
+def run_download(configuration, stocks, args):
+    """Download the stock data
+    """
+    from analyze_data import StockAnalyzer
+    StockAnalyzer().download_all_data(stocks)
+
+
+def run_analyze(configuration, stocks, args):
+    """Find the best strategy parameters and store them
+    """
+    from analyze_data import StockAnalyzer
+    sa = StockAnalyzer()
+    for stock in stocks:
+        try:
+            history_values = sa.load_history(stock)
+        except FileNotFoundError:
+            print_status(stock, "no data, run download first")
+            continue
+        result = sa.analyze_stock(stock, history_values)
+        print_result(result)
+
+
+def run_report(configuration, stocks, args):
+    """Analyze and plot the best strategy of each stock
+    """
+    from analyze_data import StockAnalyzer
+    sa = StockAnalyzer()
+    sa.create_output_folder()
+    for stock in stocks:
+        try:
+            history_values = sa.load_history(stock)
+        except FileNotFoundError:
+            print_status(stock, "no data, run download first")
+            continue
+        result = sa.analyze_stock(stock, history_values)
+        print_result(result)
+        sa.plot_result(stock, history_values, result)
+
+
+def run_signals(configuration, stocks, args):
+    """Print the latest buy/sell signal using the stored parameters
+    """
+    if args.service:
+        for stock in stocks:
+            result = query_service(configuration, f"/stocks/{stock['symbol']}")
+            if "sma_signal" in result:
+                print_signal(stock, result["sma_signal_date"], result["sma_signal"])
+            elif not result["has_data"]:
+                print_status(stock, "no data, run download first")
+            elif result["pending"]:
+                print_status(stock, "analysis pending")
+            else:
+                print_status(stock, "not analyzed yet")
+        return
+
+    from analyze_data import StockAnalyzer
+    from simple_moving_average_strategy import simple_moving_average_strategy as sma
+    import utilities
+    sa = StockAnalyzer()
+    if not os.path.isdir(sa.params_path):
+        raise SystemExit(f"error: no stored parameters in {os.path.abspath(sa.params_path)}, "
+                         "run analyze first or run from the project directory")
+    for stock in stocks:
+        try:
+            history_values = sa.load_history(stock)
+        except FileNotFoundError:
+            print_status(stock, "no data, run download first")
+            continue
+        a = sma()
+        if not a.restore_params(sa.get_params_path(stock)):
+            print_status(stock, "no stored parameters, run analyze first")
+            continue
+        a.set_signal_points(a.best_sma, a.best_lma, history_values)
+        signal_date, signal = utilities.get_latest_signal(history_values)
+        print_signal(stock, signal_date, signal)
+
+
+def run_serve(configuration, stocks, args):
+    """Run the analysis service until interrupted
+    """
+    import asyncio
+    from analysis_service import AnalysisService
+    try:
+        asyncio.run(AnalysisService().serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    """Parse the command line and run the subcommand
+
+    Args:
+        argv (list): the arguments, sys.argv if None
+    """
+    parser = argparse.ArgumentParser(prog="stockaction", description="Analyze stocks for active trading")
+    parser.add_argument("-c", "--config", help="path to the config file (default stock_config.json)")
+    parser.add_argument("--timing", action="store_true",
+                        help="print the run time, from the start of this script (excluding interpreter startup)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stock_parser = argparse.ArgumentParser(add_help=False)
+    stock_parser.add_argument("-s", "--symbols", nargs="+", default=[], metavar="SYMBOL",
+                              help="only these stocks, by symbol or name (default all monitored)")
+
+    subparsers.add_parser("download", parents=[stock_parser], help="download the stock data") \
+        .set_defaults(func=run_download)
+    subparsers.add_parser("analyze", parents=[stock_parser], help="find and store the best strategy parameters") \
+        .set_defaults(func=run_analyze)
+    signals_parser = subparsers.add_parser("signals", parents=[stock_parser],
+                                           help="print the latest signal using the stored parameters")
+    signals_parser.add_argument("--service", action="store_true",
+                                help="ask the running analysis service instead of reading the data")
+    signals_parser.set_defaults(func=run_signals)
+    subparsers.add_parser("report", parents=[stock_parser], help="analyze and plot the best strategy") \
+        .set_defaults(func=run_report)
+    subparsers.add_parser("serve", help="run the analysis service") \
+        .set_defaults(func=run_serve, symbols=[])
+
+    args = parser.parse_args(argv)
+    if args.config is not None:
+        Configuration.use_config_file(args.config)
+    try:
+        configuration = Configuration()
+    except FileNotFoundError as e:
+        raise SystemExit(f"error: config file {e.filename} not found")
+    stocks = select_stocks(configuration, args.symbols)
+    args.func(configuration, stocks, args)
+    if args.timing:
+        print(f"{args.command} took {(time.perf_counter() - START_TIME) * 1000:.0f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,9 +9,6 @@ Date: 2023-04-16
 
 from configuration import Configuration
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import matplotlib.ticker as ticker
 import json
 
 def buy_max_shares(cash, stock_price):
@@ -61,6 +58,11 @@ def plot_sell_buy_ma(sv, short_name, long_name, short_label, long_label, header)
         long_label (string): the graph label for the long strategy
         stock_name (string): the name of the stock currently being analyzed
     """
+    # matplotlib is slow to import, only load it when actually plotting
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+    import matplotlib.ticker as ticker
+
     sv.index = pd.to_datetime(sv['Date'])
     plt.figure(figsize=(12, 6))
     plt.plot(sv.index, sv['Close'], label='Close', alpha=0.5)
@@ -130,6 +132,23 @@ def calculate_return(sv, initial_capital):
     return cash
 
 
+def get_latest_signal(sv):
+    """Given history values including signal values, get the latest
+    buy or sell signal
+
+    Args:
+        sv (panda): the history values including the 'signal' column
+    Return:
+        the date of the latest signal and 1 for buy, -1 for sell.
+        (None, 0) if there is no signal
+    """
+    signals = sv[(sv['signal'] == 1) | (sv['signal'] == -1)]
+    if signals.empty:
+        return None, 0
+    last_frame = signals.iloc[-1]
+    return str(last_frame['Date']), int(last_frame['signal'])
+
+
 def calculate_midpoint_day_price(sv, target_date):
     """given history values, get the midpoint price for a particular day,
     this can be used as a rough estimate of the actual price that an active